@@ -3,10 +3,14 @@ const puppeteer = require('puppeteer');
 const fs = require('fs');
 const axeSource = fs.readFileSync(require.resolve('axe-core/axe.min.js'), 'utf8');
 
-// Args: node a11y_audit.js <URL> <WCAG_LEVELS> <DEVICE_TYPE> <OUTPUT_PATH> <KEYBOARD_TESTING>
-const [,, url, wcagLevels, deviceType, outputPath, keyboardTesting] = process.argv;
-const levels = wcagLevels.split(',');
-const enableKeyboardTesting = keyboardTesting === 'true';
+const launchArgs = [
+  '--disable-web-security',
+  '--disable-features=VizDisplayCompositor',
+  '--disable-dev-shm-usage',
+  '--no-sandbox',
+  '--disable-site-isolation-trials',
+  '--allow-running-insecure-content'
+];
 
 const mobileEmulation = {
   name: 'iPhone X',
@@ -21,18 +25,21 @@ const mobileEmulation = {
   }
 };
 
-(async () => {
-  const browser = await puppeteer.launch({
-    args: [
-      '--disable-web-security',
-      '--disable-features=VizDisplayCompositor',
-      '--disable-dev-shm-usage',
-      '--no-sandbox',
-      '--disable-site-isolation-trials',
-      '--allow-running-insecure-content'
-    ]
-  });
+// Audit a single URL on an existing browser and return the annotated,
+// self-contained HTML. Shared by the one-shot CLI below and a11y_worker.js.
+async function auditPage(browser, opts) {
+  // The worker's browser is long-lived, so a failed audit (navigation
+  // timeout, evaluate error) must not leak its page - close it either way
   const page = await browser.newPage();
+  try {
+    return await auditOnPage(page, opts);
+  } finally {
+    await page.close();
+  }
+}
+
+async function auditOnPage(page, { url, levels, deviceType, keyboardTesting }) {
+  const enableKeyboardTesting = keyboardTesting === true || keyboardTesting === 'true';
   
   // Enable all permissions for better resource loading
   await page.setDefaultNavigationTimeout(60000);
@@ -44,8 +51,12 @@ const mobileEmulation = {
     request.continue();
   });
 
+  // Pages share one browser (see a11y_worker.js), so the device difference
+  // is just per-page emulation/viewport - no second Chromium launch
   if (deviceType === "mobile") {
     await page.emulate(mobileEmulation);
+  } else {
+    await page.setViewport({ width: 1280, height: 800 });
   }
 
   // Navigate and wait for all resources to load
@@ -289,7 +300,7 @@ const mobileEmulation = {
   };
 
   if (enableKeyboardTesting) {
-    console.log('Starting keyboard navigation testing...');
+    console.error('Starting keyboard navigation testing...');
     
     await page.evaluate(() => {
       // Add keyboard navigation styles
@@ -402,7 +413,7 @@ const mobileEmulation = {
       };
     });
 
-    console.log(`Keyboard navigation test complete: ${tabOrder.focusableCount} focusable elements, ${tabOrder.unreachableCount} unreachable elements`);
+    console.error(`Keyboard navigation test complete: ${tabOrder.focusableCount} focusable elements, ${tabOrder.unreachableCount} unreachable elements`);
   }
 
   // Add violation count badge with breakdown by type and keyboard info if enabled
@@ -545,6 +556,28 @@ const mobileEmulation = {
     return html;
   }, url);
   
-  fs.writeFileSync(outputPath, selfContainedHtml, 'utf8');
-  await browser.close();
-})();
+  return selfContainedHtml;
+}
+
+// CLI: node a11y_audit.js <URL> <WCAG_LEVELS> <DEVICE_TYPE> <KEYBOARD_TESTING>
+// Writes the annotated HTML to stdout; no intermediate file needed.
+if (require.main === module) {
+  const [,, url, wcagLevels, deviceType, keyboardTesting] = process.argv;
+
+  (async () => {
+    const browser = await puppeteer.launch({ args: launchArgs });
+    try {
+      const html = await auditPage(browser, {
+        url,
+        levels: wcagLevels.split(','),
+        deviceType,
+        keyboardTesting
+      });
+      process.stdout.write(html);
+    } finally {
+      await browser.close();
+    }
+  })();
+}
+
+module.exports = { auditPage, launchArgs, mobileEmulation };
@@ -0,0 +1,57 @@
+// a11y_worker.js
+// Long-lived audit worker: launches one Chromium instance, then serves JSON
+// requests line-by-line on stdin and answers with one JSON line on stdout.
+// Request:  { id, url, standards: [...], device, keyboard }
+// Response: { id, ok: true, html } or { id, ok: false, error }
+// Spawned once per Streamlit session (see run_node_axe), which avoids the
+// Node + Puppeteer + Chromium startup cost on every audit.
+const readline = require('readline');
+const puppeteer = require('puppeteer');
+const { auditPage, launchArgs } = require('./a11y_audit');
+
+(async () => {
+  const browser = await puppeteer.launch({ args: launchArgs });
+  const rl = readline.createInterface({ input: process.stdin });
+
+  const respond = (payload) => {
+    process.stdout.write(JSON.stringify(payload) + '\n');
+  };
+
+  rl.on('line', (line) => {
+    if (!line.trim()) return;
+
+    let req;
+    try {
+      req = JSON.parse(line);
+    } catch (error) {
+      respond({ id: null, ok: false, error: `Bad request: ${error.message}` });
+      return;
+    }
+    if (req.id === undefined) {
+      respond({ id: null, ok: false, error: 'Bad request: missing id' });
+      return;
+    }
+
+    // Handle each request without awaiting so concurrently submitted audits
+    // (e.g. desktop + mobile) share the browser and run in parallel pages
+    (async () => {
+      try {
+        const html = await auditPage(browser, {
+          url: req.url,
+          levels: req.standards,
+          deviceType: req.device,
+          keyboardTesting: req.keyboard === true
+        });
+        respond({ id: req.id, ok: true, html });
+      } catch (error) {
+        respond({ id: req.id, ok: false, error: error.message });
+      }
+    })();
+  });
+
+  // stdin closing means the Python side is gone - shut down cleanly
+  rl.on('close', async () => {
+    await browser.close();
+    process.exit(0);
+  });
+})();
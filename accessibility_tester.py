@@ -1,50 +1,255 @@
 import streamlit as st
 import subprocess
-import tempfile
+import gzip
+import hashlib
 import os
 import re
 import json
+import select
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.cache import FileCache
+
+# Compiled once so reruns (every widget interaction) skip the re-cache lookup
+_URL_RE = re.compile(r'https?://', re.IGNORECASE)
 
 def is_valid_url(u):
-    return re.match(r'^https?://', u.strip()) is not None
-
-def run_node_axe(url, standards_list, device_type, keyboard_testing=False):
-    out_file = tempfile.NamedTemporaryFile(delete=False, suffix=".html").name
-    standards_str = ",".join(standards_list)
-    keyboard_flag = "true" if keyboard_testing else "false"
-    cmd = ["node", "a11y_audit.js", url, standards_str, device_type, out_file, keyboard_flag]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    
-    if result.returncode != 0:
-        st.error(f"Error running accessibility test: {result.stderr}")
-        return "<html><body><h1>Error running test</h1></body></html>"
-    
-    with open(out_file, "r", encoding="utf-8") as f:
-        html = f.read()
-    os.unlink(out_file)
+    return bool(_URL_RE.match(u.lstrip()))
+
+class _NodeWorker:
+    """Handle on a long-lived a11y_worker.js process.
+
+    The worker keeps one Chromium instance alive across audits, so each
+    run_node_axe call only pays for a new page, not Node+Puppeteer startup.
+    Requests are JSON lines tagged with an id so concurrent callers (the
+    desktop/mobile thread pool) can share the same pipe.
+    """
+
+    def __init__(self):
+        # start_new_session puts the worker and its Chromium children in
+        # their own process group, so a timeout kill takes the whole tree
+        self.proc = subprocess.Popen(
+            ["node", "a11y_worker.js"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            start_new_session=True,
+        )
+        self._buf = b""
+        self._next_id = 0
+        self._write_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+
+    def alive(self):
+        return self.proc.poll() is None
+
+    def kill(self):
+        """Kill the worker and its whole Chromium process group."""
+        try:
+            os.killpg(os.getpgid(self.proc.pid), signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            self.proc.kill()
+
+    def _read_line(self, deadline):
+        # Line-buffer over the raw fd so select() can enforce the deadline;
+        # never mix this with reads through the buffered stdout object
+        while True:
+            nl = self._buf.find(b"\n")
+            if nl >= 0:
+                line, self._buf = self._buf[:nl], self._buf[nl + 1:]
+                return line
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("timed out waiting for the a11y worker")
+            ready, _, _ = select.select([self.proc.stdout], [], [], remaining)
+            if not ready:
+                raise TimeoutError("timed out waiting for the a11y worker")
+            chunk = os.read(self.proc.stdout.fileno(), 65536)
+            if not chunk:
+                raise RuntimeError("a11y worker exited unexpectedly")
+            self._buf += chunk
+
+    def request(self, payload, timeout=60):
+        with self._write_lock:
+            self._next_id += 1
+            req_id = self._next_id
+            line = json.dumps(dict(payload, id=req_id)) + "\n"
+            self.proc.stdin.write(line.encode("utf-8"))
+            self.proc.stdin.flush()
+
+        # Responses may come back out of order; whichever thread holds the
+        # read lock parks responses for other ids until their owner collects
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._pending_lock:
+                if req_id in self._pending:
+                    return self._pending.pop(req_id)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self._read_lock.acquire(timeout=remaining):
+                raise TimeoutError(f"accessibility test timed out after {timeout} seconds")
+            try:
+                with self._pending_lock:
+                    if req_id in self._pending:
+                        return self._pending.pop(req_id)
+                resp = json.loads(self._read_line(deadline))
+            finally:
+                self._read_lock.release()
+            resp_id = resp.get("id")
+            if resp_id == req_id:
+                return resp
+            if resp_id is None:
+                # Protocol-level error with no id - nothing is waiting on it,
+                # so parking it would just strand an entry in _pending
+                continue
+            with self._pending_lock:
+                self._pending[resp_id] = resp
+
+_worker_lock = threading.Lock()
+
+def _get_worker():
+    # Must be called from the main script thread (st.session_state access)
+    with _worker_lock:
+        worker = st.session_state.get("node_worker")
+        if worker is None or not worker.alive():
+            worker = _NodeWorker()
+            st.session_state.node_worker = worker
+        return worker
+
+# Disk-backed, so audits survive Streamlit restarts (st.cache_data doesn't)
+_file_cache = FileCache(directory=".a11y-cache", ttl=3600)
+
+@st.cache_data(ttl=600, show_spinner=False, max_entries=32)
+def run_node_axe(_worker, url, standards_list, device_type, keyboard_testing=False, use_disk_cache=True):
+    # Cached so widget-only reruns (filter toggles, tab switches) don't
+    # re-audit; standards_list is the canonical tuple built from _STANDARDS,
+    # so the cache key is stable. max_entries caps memory since each cached
+    # HTML blob can be several MB. _worker is excluded from the cache key.
+    cache_key = hashlib.sha256(
+        (url + ",".join(sorted(standards_list)) + device_type + str(keyboard_testing)).encode("utf-8")
+    ).hexdigest()
+    if use_disk_cache:
+        cached = _file_cache.get(cache_key)
+        if cached is not None:
+            return cached.decode("utf-8")
+
+    # Failures raise: this runs on executor threads with no ScriptRunContext
+    # (st.error would be dropped there), and st.cache_data doesn't memoize
+    # exceptions, so the caller renders the error and a retry really reruns
+    try:
+        resp = _worker.request({
+            "url": url,
+            "standards": list(standards_list),
+            "device": device_type,
+            "keyboard": keyboard_testing,
+        }, timeout=60)
+    except TimeoutError:
+        # A hung page would otherwise pin the worker and its Chromium tree;
+        # kill the group and let _get_worker respawn it on the next audit
+        _worker.kill()
+        raise
+
+    if not resp.get("ok"):
+        raise RuntimeError(resp.get("error", "unknown error"))
+
+    html = resp["html"]
+    if use_disk_cache:
+        _file_cache.put(cache_key, html.encode("utf-8"))
     return html
 
+@st.cache_data(max_entries=8, show_spinner=False)
 def render_html(html):
     # The HTML from Puppeteer should already be self-contained with all styles
     # Just ensure it has proper DOCTYPE and meta tags if missing
-    if not html.strip().startswith('<!DOCTYPE'):
+    if not html.lstrip().startswith('<!DOCTYPE'):
         # Add DOCTYPE if missing
         html = '<!DOCTYPE html>\n' + html
-    
-    # Ensure proper meta tags are present
+
+    # Collect whatever head tags are missing and splice them in with a single
+    # slice-concat instead of three full-document str.replace passes, each of
+    # which walks and reallocates the whole (potentially multi-MB) string
+    head_at = html.find('<head>', 0, 4096)
+    if head_at == -1:
+        return html
+    head_end = head_at + len('<head>')
+
+    missing = []
     if '<meta charset=' not in html:
-        html = html.replace('<head>', '<head>\n    <meta charset="UTF-8">')
-    
+        missing.append('    <meta charset="UTF-8">')
+
     if 'viewport' not in html:
-        html = html.replace('<head>', '<head>\n    <meta name="viewport" content="width=device-width, initial-scale=1.0">')
-    
+        missing.append('    <meta name="viewport" content="width=device-width, initial-scale=1.0">')
+
     # Add CSP to allow all resources
     csp_meta = '<meta http-equiv="Content-Security-Policy" content="default-src * \'unsafe-inline\' \'unsafe-eval\' data: blob:;">'
     if 'Content-Security-Policy' not in html:
-        html = html.replace('<head>', f'<head>\n    {csp_meta}')
-    
+        missing.append(f'    {csp_meta}')
+
+    if missing:
+        html = html[:head_end] + '\n' + '\n'.join(missing) + html[head_end:]
+
     return html
 
+class _AuditHTMLHandler(BaseHTTPRequestHandler):
+    """Serves rendered audit pages from an in-memory store.
+
+    Pages are kept gzip-compressed - the annotated HTML is highly
+    repetitive (duplicated axe markup and CSS) and compresses 5-10x - and
+    served as-is with Content-Encoding: gzip when the browser accepts it.
+    """
+
+    pages = {}
+
+    def do_GET(self):
+        page = self.pages.get(self.path.lstrip('/'))
+        if page is None:
+            self.send_error(404)
+            return
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = page
+        else:
+            body = gzip.decompress(page)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        if body is page:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # keep request noise out of the Streamlit console
+
+@st.cache_resource
+def _get_html_server():
+    """One localhost HTTP server per process for the audit iframes.
+
+    Embedding the audit HTML inline pushes the full multi-MB string through
+    the Streamlit websocket on every rerun; serving it from a stable local
+    URL means only the URL crosses the wire and the iframe loads it itself.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _AuditHTMLHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def _publish_html(html):
+    """Store rendered HTML and return the localhost URL serving it."""
+    server = _get_html_server()
+    raw = html.encode("utf-8")
+    token = hashlib.sha256(raw).hexdigest()[:16] + ".html"
+    pages = _AuditHTMLHandler.pages
+    if token not in pages:
+        # Compress once at publish time; the store and the transfer both
+        # carry the compressed bytes
+        pages[token] = gzip.compress(raw)
+        while len(pages) > 16:
+            pages.pop(next(iter(pages)))
+    return f"http://127.0.0.1:{server.server_address[1]}/{token}"
+
 # --- Streamlit UI ---
 st.set_page_config(page_title="Accessibility Visual Tester", layout="wide")
 st.title("WCAG Accessibility Tests")
@@ -60,61 +265,72 @@ st.markdown("""
 
 url = st.text_input("Enter a URL to test", "https://httpbin.org/html")
 
-st.markdown("**Select Testing Standards (choose one or more):**")
-col1, col2, col3, col4 = st.columns(4)
+# (checkbox label, standard tag passed to axe, help text) - fixed order, so
+# the selected tuple below is canonical and cache-key friendly as-is
+_STANDARDS = (
+    ("WCAG 2.0 A", "WCAG 2.0A", "Web Content Accessibility Guidelines 2.0 Level A"),
+    ("WCAG 2.0 AA", "WCAG 2.0AA", "Web Content Accessibility Guidelines 2.0 Level AA"),
+    ("Best Practice", "Best-practice", "Industry best practices for accessibility"),
+    ("ARIA Rules", "Aria", "Accessible Rich Internet Applications guidelines"),
+)
 
-with col1:
-    wcag2a = st.checkbox("WCAG 2.0 A", help="Web Content Accessibility Guidelines 2.0 Level A")
-with col2:
-    wcag2aa = st.checkbox("WCAG 2.0 AA", help="Web Content Accessibility Guidelines 2.0 Level AA")
-with col3:
-    best_practice = st.checkbox("Best Practice", help="Industry best practices for accessibility")
-with col4:
-    aria = st.checkbox("ARIA Rules", help="Accessible Rich Internet Applications guidelines")
+st.markdown("**Select Testing Standards (choose one or more):**")
+flags = {}
+for col, (label, standard, help_text) in zip(st.columns(len(_STANDARDS)), _STANDARDS):
+    with col:
+        flags[standard] = st.checkbox(label, help=help_text)
 
 st.markdown("**Additional Testing Options:**")
 keyboard_testing = st.checkbox("⌨️ Keyboard Navigation Testing", help="Test keyboard accessibility and show tab order with numbered indicators")
+use_disk_cache = st.checkbox("💾 Reuse cached results", value=True, help="Keep audit results on disk for an hour so repeat audits of the same URL are instant, even across restarts")
 
 # Collect selected standards
-selected_standards = []
-if wcag2a:
-    selected_standards.append("WCAG 2.0A")
-if wcag2aa:
-    selected_standards.append("WCAG 2.0AA")
-if best_practice:
-    selected_standards.append("Best-practice")
-if aria:
-    selected_standards.append("Aria")
-
-if url and not is_valid_url(url):
+selected_standards = tuple(standard for _, standard, _ in _STANDARDS if flags[standard])
+
+valid_url = bool(url) and is_valid_url(url)
+
+if url and not valid_url:
     st.warning("Please enter a valid URL starting with http:// or https://")
 
-if url and is_valid_url(url):
+if valid_url:
     if not selected_standards:
         st.info("Please select at least one testing standard above to run the audit.")
     else:
         st.info(f"**Selected standards:** {', '.join(selected_standards)}")
         if st.button("Run Accessibility Audit", type="primary"):
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                with st.spinner("Testing desktop view..."):
-                    desktop_html = run_node_axe(url, selected_standards, "desktop", keyboard_testing)
-            
-            with col2:
-                with st.spinner("Testing mobile view..."):
-                    mobile_html = run_node_axe(url, selected_standards, "mobile", keyboard_testing)
+
+            # Run both audits concurrently - subprocess.run releases the GIL
+            # while waiting, so threads are enough to overlap the two Node runs
+            worker = _get_worker()
+
+            error_html = "<html><body><h1>Error running test</h1></body></html>"
+
+            with st.spinner("Testing desktop & mobile in parallel..."):
+                with ThreadPoolExecutor(max_workers=2) as executor:
+                    desktop_future = executor.submit(run_node_axe, worker, url, selected_standards, "desktop", keyboard_testing, use_disk_cache)
+                    mobile_future = executor.submit(run_node_axe, worker, url, selected_standards, "mobile", keyboard_testing, use_disk_cache)
+
+            # Collect on the main thread so st.error has a ScriptRunContext
+            try:
+                desktop_html = desktop_future.result()
+            except Exception as e:
+                st.error(f"Error running desktop accessibility test: {e}")
+                desktop_html = error_html
+            try:
+                mobile_html = mobile_future.result()
+            except Exception as e:
+                st.error(f"Error running mobile accessibility test: {e}")
+                mobile_html = error_html
 
             # Create tabs for better organization
             tab1, tab2 = st.tabs(["💻 Desktop View", "📱 Mobile View"])
             
             with tab1:
                 st.markdown("**Desktop View** - Hover over red-outlined elements to see accessibility issues")
-                st.components.v1.html(render_html(desktop_html), height=700, scrolling=True)
+                st.components.v1.iframe(_publish_html(render_html(desktop_html)), height=700, scrolling=True)
             
             with tab2:
-                st.markdown("**Mobile View** - Hover over red-outlined elements to see accessibility issues") 
-                st.components.v1.html(render_html(mobile_html), height=700, scrolling=True)
+                st.markdown("**Mobile View** - Hover over red-outlined elements to see accessibility issues")
+                st.components.v1.iframe(_publish_html(render_html(mobile_html)), height=700, scrolling=True)
                 
             st.success("✅ Accessibility audit completed! Hover over highlighted elements for detailed issue information.")
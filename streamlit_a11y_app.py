@@ -1,45 +1,278 @@
 import streamlit as st
 import subprocess
 import json
+import os
+import tempfile
 import time
 from typing import Dict, Any
+from urllib.parse import urlparse
+
+try:
+    from playwright.sync_api import sync_playwright
+    _HAS_PLAYWRIGHT = True
+except ImportError:
+    _HAS_PLAYWRIGHT = False
+
+try:
+    # 3-5x faster than stdlib json on the multi-MB Node payload
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# axe-core is already vendored through npm; reuse its bundle for the
+# in-process path instead of pulling in a separate Python wrapper
+_AXE_SOURCE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    'node_modules', 'axe-core', 'axe.min.js'
+)
+
+# Mirrors the allowlist in streamlit_a11y_checker.js
+_ALLOWED_HOSTS = {
+    "cra-design.github.io",
+    "cra-proto.github.io",
+    "gc-proto.github.io",
+    "test.canada.ca",
+    "www.canada.ca",
+}
+
+_IMPACT_TO_TYPE = {
+    'critical': 'error',
+    'serious': 'error',
+    'moderate': 'warning',
+    'minor': 'notice',
+}
+
+_HIGHLIGHT_SCRIPT = """
+(issues) => {
+  // Strip scripts and force links into new tabs, like the Node checker does
+  document.querySelectorAll('script').forEach(s => s.remove());
+  document.querySelectorAll('a').forEach(a => a.setAttribute('target', '_blank'));
+
+  const style = document.createElement('style');
+  style.textContent = `
+    .pa11y-violation {
+      position: relative;
+      outline: 3px solid #d63384 !important;
+      outline-offset: 2px;
+      background-color: rgba(214, 51, 132, 0.1) !important;
+    }
+    .pa11y-error { outline-color: #dc3545 !important; background-color: rgba(220, 53, 69, 0.2) !important; }
+    .pa11y-warning { outline-color: #ff8c00 !important; background-color: rgba(255, 140, 0, 0.25) !important; }
+    .pa11y-notice { outline-color: #ffc107 !important; background-color: rgba(255, 193, 7, 0.1) !important; }
+  `;
+  document.head.appendChild(style);
+
+  for (const issue of issues) {
+    try {
+      const el = document.querySelector(issue.selector);
+      if (el) {
+        el.classList.add('pa11y-violation', 'pa11y-' + issue.type);
+        el.title = issue.type.toUpperCase() + ': ' + issue.messageShort + ' (' + issue.code + ')';
+      }
+    } catch (e) {
+      // Skip selectors the page no longer matches
+    }
+  }
+}
+"""
+
+class A11yCheckError(RuntimeError):
+    """Carries a failed check result out of the cached function.
+
+    st.cache_data memoizes return values but not exceptions; raising keeps a
+    transient failure from being replayed for the whole ttl.
+    """
+
+    def __init__(self, result: Dict[str, Any]):
+        super().__init__(result.get('error', 'unknown error'))
+        self.result = result
+
+def _error_result(url: str, message: str) -> Dict[str, Any]:
+    return {
+        'success': False,
+        'url': url,
+        'error': message,
+        'streamlitHtml': f'<div style="padding: 20px; color: red;">Error: {message}</div>'
+    }
+
+def _run_in_process(url: str) -> Dict[str, Any]:
+    """Audit with Playwright + axe-core in-process.
+
+    Avoids the Node child entirely: no subprocess startup, no JSON
+    serialization of the multi-MB payload across a pipe - axe results come
+    back as native dicts. Playwright's sync-API objects are bound to the
+    thread that created them and Streamlit runs each rerun on a fresh
+    ScriptRunner thread, so the browser is launched and stopped per call
+    rather than cached across reruns.
+    """
+    host = urlparse(url).netloc
+    if host not in _ALLOWED_HOSTS:
+        return _error_result(url, f"Invalid URL: {host} is blocked")
+
+    with open(_AXE_SOURCE_PATH, 'r', encoding='utf-8') as f:
+        axe_source = f.read()
+
+    try:
+        with sync_playwright() as p:
+            browser = p.chromium.launch(
+                headless=True,
+                args=['--no-sandbox', '--disable-setuid-sandbox']
+            )
+            try:
+                return _audit_page(browser, url, axe_source)
+            finally:
+                browser.close()
+    except Exception as e:
+        return _error_result(url, str(e))
+
+def _audit_page(browser, url: str, axe_source: str) -> Dict[str, Any]:
+    context = browser.new_context()
+    try:
+        page = context.new_page()
+        page.goto(url, wait_until='networkidle', timeout=60000)
+        page.add_script_tag(content=axe_source)
+        results = page.evaluate(
+            "async () => await axe.run(document, "
+            "{runOnly: {type: 'tag', values: ['wcag2a', 'wcag2aa', 'wcag21aa']}})"
+        )
+
+        issues = []
+        for violation in results['violations']:
+            issue_type = _IMPACT_TO_TYPE.get(violation.get('impact'), 'warning')
+            for node in violation['nodes']:
+                # Same pre-truncated shape the Node checker emits
+                issues.append({
+                    'type': issue_type,
+                    'messageShort': violation.get('help', '')[:100],
+                    'code': violation.get('id', ''),
+                    'selector': ', '.join(node.get('target', [])),
+                    'contextShort': node.get('html', '')[:200],
+                })
+
+        page.evaluate(_HIGHLIGHT_SCRIPT, issues)
+        html = page.content()
+
+        summary = {
+            'url': url,
+            'totalIssues': len(issues),
+            'errors': sum(1 for i in issues if i['type'] == 'error'),
+            'warnings': sum(1 for i in issues if i['type'] == 'warning'),
+            'notices': sum(1 for i in issues if i['type'] == 'notice'),
+            'issues': issues,
+        }
+        return {
+            'success': True,
+            'url': url,
+            'summary': summary,
+            'streamlitHtml': html,
+        }
+    finally:
+        context.close()
+
+@st.cache_data(ttl=600, show_spinner=False, max_entries=32)
+def _cached_run(node_script: str, url: str) -> Dict[str, Any]:
+    """Run an accessibility check and return results.
+
+    Prefers the in-process Playwright path when available; falls back to the
+    Node.js checker subprocess otherwise. Cached so Streamlit reruns (filter
+    changes, widget interactions) reuse the last audit instead of paying the
+    30-60s audit cost again; max_entries bounds memory since each result
+    holds the annotated HTML.
+    """
+    if _HAS_PLAYWRIGHT and os.path.exists(_AXE_SOURCE_PATH):
+        result = _run_in_process(url)
+    else:
+        result = _run_node(node_script, url)
+    if not result.get('success'):
+        raise A11yCheckError(result)
+    return result
+
+def _run_node(node_script: str, url: str) -> Dict[str, Any]:
+    """Fallback: shell out to the Node.js checker."""
+    proc = None
+    # This side owns the side-file path and hands it to Node, so cleanup in
+    # the finally below works even when the child is killed on timeout or
+    # its JSON never arrives - the path doesn't have to survive the payload
+    html_path = tempfile.NamedTemporaryFile(delete=False, suffix=".html").name
+    try:
+        # Pipe the Node.js script instead of buffering its whole output:
+        # json.load consumes stdout as bytes directly, avoiding the extra
+        # text-decoded copy of the (potentially multi-MB) payload that
+        # capture_output=True + text=True would make
+        proc = subprocess.Popen(
+            ['node', node_script, url, html_path],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+
+        # communicate() drains both pipes concurrently as bytes - a chatty
+        # Chromium can emit hundreds of KB of stderr noise, which stays
+        # undecoded on the happy path and can't stall the child either
+        out, err = proc.communicate(timeout=60)  # 60 second timeout
+
+        if proc.returncode == 0:
+            data = _loads(out)
+            if data.pop('htmlPath', None):
+                # The annotated HTML rides in the side file so the JSON
+                # stays small; pull it in
+                with open(html_path, 'r', encoding='utf-8') as f:
+                    data['streamlitHtml'] = f.read()
+            return data
+        else:
+            stderr = err.decode('utf-8', 'replace')
+            return {
+                'success': False,
+                'error': f"Node.js script failed: {stderr}",
+                'streamlitHtml': f'<div style="padding: 20px; color: red;">Error: {stderr}</div>'
+            }
+
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        return {
+            'success': False,
+            'error': "Request timed out",
+            'streamlitHtml': '<div style="padding: 20px; color: red;">Request timed out after 60 seconds</div>'
+        }
+    except Exception as e:
+        if proc is not None and proc.poll() is None:
+            proc.kill()
+        return {
+            'success': False,
+            'error': str(e),
+            'streamlitHtml': f'<div style="padding: 20px; color: red;">Error: {str(e)}</div>'
+        }
+    finally:
+        try:
+            os.unlink(html_path)
+        except OSError:
+            pass
+
+
+_SEVERITY_EMOJI = {"error": "🚨", "warning": "⚠️", "notice": "ℹ️"}
+
+def _bucket_issues(issues):
+    """Bucket issues by type and prebuild their expander titles.
+
+    Done once per audit so the filter selectbox is an O(1) dict lookup on
+    rerun instead of an O(N) rescan of the full issue list.
+    """
+    buckets = {'all': issues, 'error': [], 'warning': [], 'notice': []}
+    for issue in issues:
+        emoji = _SEVERITY_EMOJI.get(issue['type'], '•')
+        issue['title'] = f"{emoji} {issue['type'].upper()}: {issue['messageShort']}..."
+        buckets.setdefault(issue['type'], []).append(issue)
+    return buckets
 
 class StreamlitA11yIntegration:
     def __init__(self):
         self.node_script = './streamlit_a11y_checker.js'
-    
+
     def run_accessibility_check(self, url: str) -> Dict[str, Any]:
-        """Run the Node.js accessibility checker and return results"""
         try:
-            # Run the Node.js script
-            result = subprocess.run(
-                ['node', self.node_script, url],
-                capture_output=True,
-                text=True,
-                timeout=60  # 60 second timeout
-            )
-            
-            if result.returncode == 0:
-                return json.loads(result.stdout)
-            else:
-                return {
-                    'success': False,
-                    'error': f"Node.js script failed: {result.stderr}",
-                    'streamlitHtml': f'<div style="padding: 20px; color: red;">Error: {result.stderr}</div>'
-                }
-                
-        except subprocess.TimeoutExpired:
-            return {
-                'success': False,
-                'error': "Request timed out",
-                'streamlitHtml': '<div style="padding: 20px; color: red;">Request timed out after 60 seconds</div>'
-            }
-        except Exception as e:
-            return {
-                'success': False,
-                'error': str(e),
-                'streamlitHtml': f'<div style="padding: 20px; color: red;">Error: {str(e)}</div>'
-            }
+            return _cached_run(self.node_script, url)
+        except A11yCheckError as e:
+            return e.result
 
 def main():
     st.set_page_config(
@@ -91,16 +324,26 @@ def main():
             else:
                 st.error("Please enter a URL")
     
-    # Main content area
-    if hasattr(st.session_state, 'run_test') and st.session_state.run_test:
+    # Run the audit only when the button armed the one-shot flag; the result
+    # itself lives in session_state so reruns triggered by widgets below
+    # (e.g. the issue filter) redisplay it without touching the subprocess
+    if st.session_state.get('run_test'):
         test_url = st.session_state.test_url
-        
-        st.header(f"Testing: {test_url}")
-        
+
         # Show loading spinner
         with st.spinner("Running accessibility check... This may take 30-60 seconds."):
             result = a11y_checker.run_accessibility_check(test_url)
-        
+        st.session_state.result = result
+        if result['success']:
+            st.session_state.issues_by_type = _bucket_issues(result['summary']['issues'])
+        st.session_state.run_test = False
+
+    # Main content area
+    if 'result' in st.session_state:
+        result = st.session_state.result
+
+        st.header(f"Testing: {st.session_state.test_url}")
+
         if result['success']:
             summary = result['summary']
             
@@ -137,21 +380,32 @@ def main():
                     ["All", "Errors", "Warnings", "Notices"]
                 )
                 
-                # Filter issues
-                filtered_issues = summary['issues']
-                if filter_type != "All":
-                    filter_map = {"Errors": "error", "Warnings": "warning", "Notices": "notice"}
-                    filtered_issues = [i for i in summary['issues'] if i['type'] == filter_map[filter_type]]
-                
+                # Filter issues - pre-bucketed by type, so this is a lookup
+                filter_map = {"Errors": "error", "Warnings": "warning", "Notices": "notice"}
+                filtered_issues = st.session_state.issues_by_type[filter_map.get(filter_type, 'all')]
+
+                # Paginate so the browser only holds one page of expanders
+                # at a time, however many violations the audit found
+                per_page = 25
+                total_pages = max(1, (len(filtered_issues) + per_page - 1) // per_page)
+                if total_pages > 1:
+                    page = st.number_input("Page", min_value=1, max_value=total_pages, value=1)
+                else:
+                    page = 1
+                start = (page - 1) * per_page
+                page_issues = filtered_issues[start:start + per_page]
+                if page_issues:
+                    st.caption(f"Showing {start + 1}-{start + len(page_issues)} of {len(filtered_issues)} issues")
+                else:
+                    st.caption("No issues match this filter")
+
                 # Display issues in an expandable format
-                for i, issue in enumerate(filtered_issues):
-                    severity_emoji = {"error": "🚨", "warning": "⚠️", "notice": "ℹ️"}
-                    
-                    with st.expander(f"{severity_emoji.get(issue['type'], '•')} {issue['type'].upper()}: {issue['message'][:100]}..."):
+                for issue in page_issues:
+                    with st.expander(issue['title']):
                         st.write(f"**Code:** `{issue['code']}`")
                         st.write(f"**Element:** `{issue['selector']}`")
-                        if issue.get('context'):
-                            st.write(f"**Context:** {issue['context'][:200]}...")
+                        if issue.get('contextShort'):
+                            st.write(f"**Context:** {issue['contextShort']}...")
             
         else:
             st.error(f"Failed to check accessibility: {result['error']}")
@@ -159,10 +413,7 @@ def main():
             # Still show the error HTML if available
             if 'streamlitHtml' in result:
                 st.components.v1.html(result['streamlitHtml'], height=200)
-        
-        # Reset the test flag
-        st.session_state.run_test = False
-    
+
     else:
         # Show instructions when no test is running
         st.info("👈 Enter a URL in the sidebar and click 'Run Accessibility Check' to begin")
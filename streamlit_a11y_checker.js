@@ -1,5 +1,8 @@
 const pa11y = require('pa11y');
 const cheerio = require('cheerio');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
 const { chromium } = require('playwright');
 
 class StreamlitAccessibilityChecker {
@@ -336,12 +339,15 @@ class StreamlitAccessibilityChecker {
         errors: pa11yResults.issues.filter(i => i.type === 'error').length,
         warnings: pa11yResults.issues.filter(i => i.type === 'warning').length,
         notices: pa11yResults.issues.filter(i => i.type === 'notice').length,
+        // Pre-truncated here so the Python side renders them as-is - the UI
+        // only ever shows the first 100/200 chars, and shipping the short
+        // forms keeps the JSON payload small on issue-heavy pages
         issues: pa11yResults.issues.map(issue => ({
           type: issue.type,
-          message: issue.message,
+          messageShort: (issue.message || '').slice(0, 100),
           code: issue.code,
           selector: issue.selector,
-          context: issue.context
+          contextShort: (issue.context || '').slice(0, 200)
         }))
       };
       
@@ -372,13 +378,31 @@ if (require.main === module) {
     const url = process.argv[2];
     
     if (!url) {
-      console.log('Usage: node streamlit_a11y_checker.js <url>');
+      console.log('Usage: node streamlit_a11y_checker.js <url> [htmlPath]');
       process.exit(1);
     }
     
     try {
       const result = await checker.processUrlForStreamlit(url);
-      console.log(JSON.stringify(result, null, 2));
+      if (result.success) {
+        // Ship the annotated HTML via a side file instead of inline in the
+        // JSON: embedding a multi-MB document means escaping every quote
+        // and newline on this side and un-escaping it again in Python. The
+        // payload on stdout stays small (rawResults is also left out - the
+        // Streamlit side never reads it). The caller passes the path so it
+        // can clean the file up even if this process dies before printing.
+        const htmlPath = process.argv[3]
+          || path.join(os.tmpdir(), `a11y-${process.pid}-${Date.now()}.html`);
+        fs.writeFileSync(htmlPath, result.streamlitHtml, 'utf8');
+        console.log(JSON.stringify({
+          success: true,
+          url: result.url,
+          summary: result.summary,
+          htmlPath
+        }));
+      } else {
+        console.log(JSON.stringify(result));
+      }
     } catch (error) {
       console.error('Error:', error.message);
     } finally {
@@ -0,0 +1,39 @@
+import os
+import time
+from typing import Optional
+
+class FileCache:
+    """Tiny disk-backed cache for audit results.
+
+    st.cache_data only lives as long as the Streamlit process, so every
+    dev-loop restart re-pays the 30-60s audit. Entries here are plain files
+    named by their key under a cache directory, expired by mtime against a
+    TTL, and survive restarts.
+    """
+
+    def __init__(self, directory: str = '.a11y-cache', ttl: int = 3600):
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.unlink(path)
+                return None
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, key: str, data: bytes) -> None:
+        # Write-then-rename so concurrent readers never see a partial entry
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)